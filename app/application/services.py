@@ -1,47 +1,214 @@
+import itertools
 import json
+import math
 import time
-from typing import Dict, Any
+from dataclasses import dataclass, field
+from typing import Dict, Any, List
 import asyncio
-from ..domain.entities import Message
-from ..core.constants import ErrorMessages, Commands
+from ..domain.entities import Message, SharedBuffer
+from ..core.config import Settings
+from ..core.constants import ErrorMessages, Commands, split_command
 from .use_cases import ChatUseCases
 
 
+@dataclass
+class PendingUpload:
+    size: int
+    received: int = 0
+    parts: List[str] = field(default_factory=list)
+    last_activity: float = field(default_factory=time.monotonic)
+    # Timed out: its budget is released and remaining frames are discarded
+    expired: bool = False
+    notified: bool = False
+
+
 class ChatService:
-    def __init__(self, use_cases: ChatUseCases, message_ttl: int = 30):
+    def __init__(
+        self,
+        use_cases: ChatUseCases,
+        message_ttl: int = 30,
+        max_topic_members: int = 0,
+        max_message_length: int = 0,
+        max_upload_size: int = 0,
+        stream_chunk_size: int = 16384,
+        max_upload_buffer: int = 0,
+        upload_idle_timeout: float = 0,
+    ):
         self.use_cases = use_cases
         self.message_ttl = message_ttl
+        self.max_topic_members = max_topic_members
+        self.max_message_length = max_message_length
+        self.max_upload_size = max_upload_size
+        self.stream_chunk_size = stream_chunk_size
+        self.max_upload_buffer = max_upload_buffer
+        self.upload_idle_timeout = upload_idle_timeout
+        # Broadcast sends queued but not yet completed, used as a load signal
+        self.pending_sends = 0
+        self.uploads: Dict[tuple[str, str], PendingUpload] = {}
+        # Declared sizes of all uploads in progress, bounded by max_upload_buffer
+        self.upload_reserved = 0
+    
+    @classmethod
+    def from_settings(cls, use_cases: ChatUseCases, config: Settings, **overrides) -> "ChatService":
+        """Build a service with its limits taken from Settings"""
+        options = dict(
+            message_ttl=config.message_ttl,
+            max_topic_members=config.max_topic_members,
+            max_message_length=config.max_message_length,
+            max_upload_size=config.max_upload_size,
+            stream_chunk_size=config.stream_chunk_size,
+            max_upload_buffer=config.max_upload_buffer,
+            upload_idle_timeout=config.upload_idle_timeout,
+        )
+        options.update(overrides)
+        return cls(use_cases, **options)
     
     async def process_connection(self, websocket, data: Dict[str, Any]) -> tuple[str, str]:
-        """Process initial connection"""
+        """Process initial connection; raises ValueError(ErrorMessages) on rejection"""
         if not data.get("username"):
-            await websocket.send_json({"error": ErrorMessages.USERNAME_REQUIRED})
             raise ValueError(ErrorMessages.USERNAME_REQUIRED)
         
         if not data.get("topic"):
-            await websocket.send_json({"error": ErrorMessages.TOPIC_REQUIRED})
             raise ValueError(ErrorMessages.TOPIC_REQUIRED)
         
         username = data["username"]
         topic = data["topic"]
         
+        if self.max_topic_members:
+            existing = await self.use_cases.repository.get_topic(topic)
+            if existing and existing.user_count >= self.max_topic_members:
+                raise ValueError(ErrorMessages.TOPIC_FULL)
+        
         unique_username, user = await self.use_cases.handle_user_join(
             topic, username, websocket
         )
         
         return unique_username, topic
     
+    def is_uploading(self, topic: str, username: str) -> bool:
+        return (topic, username) in self.uploads
+    
     async def process_message(self, topic: str, username: str, content: str, websocket) -> None:
         """Process incoming message"""
-        if content.strip() == Commands.LIST:
+        command, argument = split_command(content)
+        
+        upload = self.uploads.get((topic, username))
+        if upload is not None:
+            if not upload.expired and self._upload_expired(upload, time.monotonic()):
+                self._expire_upload(upload)
+            if not upload.expired:
+                await self._process_upload_data(topic, username, upload, content, websocket)
+                return
+            if command != Commands.UPLOAD:
+                await self._discard_expired_upload_data(topic, username, upload, content, websocket)
+                return
+            # A new /upload replaces the expired one
+            self._end_upload(topic, username)
+        
+        if command == Commands.LIST:
             # Handle list command
             response = await self.use_cases.handle_list_command(topic)
             await websocket.send_json(response)
             return
         
+        if command == Commands.UPLOAD:
+            await self._start_upload(topic, username, argument, websocket)
+            return
+        
+        if self.max_message_length and len(content) > self.max_message_length:
+            await websocket.send_json({"error": ErrorMessages.MESSAGE_TOO_LONG})
+            return
+        
         # Handle regular message
         message = await self.use_cases.handle_message(topic, username, content)
+        await self._deliver(message, websocket)
+    
+    async def _start_upload(self, topic: str, username: str, size_arg: str, websocket) -> None:
+        """Begin a chunked upload announced with /upload <size>"""
+        try:
+            size = int(size_arg)
+        except ValueError:
+            size = 0
+        
+        if size <= 0:
+            await websocket.send_json({"error": ErrorMessages.INVALID_UPLOAD})
+            return
+        
+        if self.max_upload_size and size > self.max_upload_size:
+            await websocket.send_json({"error": ErrorMessages.UPLOAD_TOO_LARGE})
+            return
         
+        if self.max_upload_buffer and self.upload_reserved + size > self.max_upload_buffer:
+            self._expire_idle_uploads()
+            if self.upload_reserved + size > self.max_upload_buffer:
+                await websocket.send_json({"error": ErrorMessages.UPLOAD_CAPACITY})
+                return
+        
+        self.uploads[(topic, username)] = PendingUpload(size=size)
+        self.upload_reserved += size
+        await websocket.send_json({"type": "upload_ready", "size": size})
+    
+    def _end_upload(self, topic: str, username: str) -> None:
+        upload = self.uploads.pop((topic, username), None)
+        if upload is not None and not upload.expired:
+            self.upload_reserved -= upload.size
+    
+    def _expire_upload(self, upload: PendingUpload) -> None:
+        """Release a stalled upload's budget but keep it as a marker.
+        
+        The client may still be sending the rest of the upload; those frames
+        must be discarded rather than posted to the topic as chat.
+        """
+        upload.expired = True
+        upload.parts.clear()
+        self.upload_reserved -= upload.size
+    
+    async def _discard_expired_upload_data(
+        self, topic: str, username: str, upload: PendingUpload, content: str, websocket
+    ) -> None:
+        """Drop frames of an expired upload until its declared size has passed"""
+        if not upload.notified:
+            upload.notified = True
+            await websocket.send_json({"error": ErrorMessages.UPLOAD_EXPIRED})
+        upload.received += len(content)
+        if upload.received >= upload.size:
+            self._end_upload(topic, username)
+    
+    def _upload_expired(self, upload: PendingUpload, now: float) -> bool:
+        return bool(self.upload_idle_timeout) and now - upload.last_activity > self.upload_idle_timeout
+    
+    def _expire_idle_uploads(self) -> None:
+        """Drop stalled uploads so their reserved budget can be reused"""
+        now = time.monotonic()
+        for upload in self.uploads.values():
+            if not upload.expired and self._upload_expired(upload, now):
+                self._expire_upload(upload)
+    
+    async def _process_upload_data(
+        self, topic: str, username: str, upload: PendingUpload, content: str, websocket
+    ) -> None:
+        """Collect upload frames until the announced size has arrived"""
+        upload.parts.append(content)
+        upload.received += len(content)
+        upload.last_activity = time.monotonic()
+        
+        if upload.received > upload.size:
+            self._end_upload(topic, username)
+            await websocket.send_json({"error": ErrorMessages.UPLOAD_OVERFLOW})
+            return
+        
+        if upload.received < upload.size:
+            return
+        
+        self._end_upload(topic, username)
+        body = SharedBuffer("".join(upload.parts))
+        upload.parts.clear()
+        
+        message = await self.use_cases.handle_message(topic, username, "", body)
+        await self._deliver(message, websocket)
+    
+    async def _deliver(self, message: Message, websocket) -> None:
+        """Acknowledge a stored message to its sender and broadcast it"""
         if message:
             # Send acknowledgment to sender
             await websocket.send_json({
@@ -54,7 +221,7 @@ class ChatService:
             await self._broadcast_message(message)
             
             # Schedule message cleanup
-            asyncio.create_task(self._schedule_message_cleanup(topic, message.id))
+            asyncio.create_task(self._schedule_message_cleanup(message.topic, message.id))
     
     async def _broadcast_message(self, message: Message):
         """Broadcast message to all users in topic except sender"""
@@ -62,14 +229,78 @@ class ChatService:
         if not topic:
             return
         
-        message_dict = message.to_dict()
+        recipients = [user for user in topic.users.values() if user.username != message.username]
         
-        for user in topic.users.values():
-            if user.username != message.username:
+        if message.body is not None:
+            await self._stream_message(message, recipients)
+            return
+        
+        message_dict = message.to_dict()
+        remaining = len(recipients)
+        self.pending_sends += remaining
+        try:
+            for user in recipients:
                 try:
                     await user.websocket.send_json(message_dict)
                 except Exception as e:
                     print(f"Error broadcasting to {user.username}: {e}")
+                remaining -= 1
+                self.pending_sends -= 1
+        finally:
+            self.pending_sends -= remaining
+    
+    async def _stream_message(self, message: Message, recipients: list):
+        """Stream a chunked message to recipients one fragment at a time.
+        
+        Each fragment is serialized once and shared by every send, so memory
+        stays bounded by the fragment size rather than the topic size.
+        """
+        body = message.body.acquire()
+        fragment_count = math.ceil(body.size / self.stream_chunk_size)
+        # Built lazily so only the fragment being sent is held besides the body
+        frames = itertools.chain(
+            [{
+                "type": "message_start",
+                "message_id": message.id,
+                "username": message.username,
+                "topic": message.topic,
+                "timestamp": message.timestamp,
+                "size": body.size,
+                "fragments": fragment_count
+            }],
+            (
+                {"type": "message_chunk", "message_id": message.id, "data": fragment}
+                for fragment in body.fragments(self.stream_chunk_size)
+            ),
+            [{"type": "message_end", "message_id": message.id}]
+        )
+        
+        try:
+            for frame in frames:
+                text = self._serialize_frame(frame)
+                delivered = []
+                # Only the fragment currently being fanned out counts as queued,
+                # so one long stream does not read as server-wide overload
+                remaining = len(recipients)
+                self.pending_sends += remaining
+                try:
+                    for user in recipients:
+                        try:
+                            await user.websocket.send_text(text)
+                            delivered.append(user)
+                        except Exception as e:
+                            print(f"Error streaming to {user.username}: {e}")
+                        remaining -= 1
+                        self.pending_sends -= 1
+                finally:
+                    self.pending_sends -= remaining
+                recipients = delivered
+        finally:
+            body.release()
+    
+    def _serialize_frame(self, frame: Dict[str, Any]) -> str:
+        """Encode a stream frame once for all of its recipients"""
+        return json.dumps(frame, separators=(",", ":"), ensure_ascii=False)
     
     async def _schedule_message_cleanup(self, topic_name: str, message_id: str):
         """Schedule message cleanup after TTL"""
@@ -80,4 +311,5 @@ class ChatService:
     
     async def handle_disconnection(self, topic: str, username: str):
         """Handle user disconnection"""
+        self._end_upload(topic, username)
         await self.use_cases.handle_user_leave(topic, username)
\ No newline at end of file
@@ -1,7 +1,7 @@
 from typing import Dict, List, Optional
 import time
 import asyncio
-from ..domain.entities import Message, User
+from ..domain.entities import Message, SharedBuffer, User
 from ..domain.repository import ChatRepository
 from ..core.constants import Commands
 
@@ -23,7 +23,9 @@ class ChatUseCases:
         
         return unique_username, user
     
-    async def handle_message(self, topic_name: str, username: str, content: str) -> Optional[Message]:
+    async def handle_message(
+        self, topic_name: str, username: str, content: str, body: Optional[SharedBuffer] = None
+    ) -> Optional[Message]:
         """Handle sending a message to a topic"""
         if content.strip() == Commands.LIST:
             return None
@@ -32,7 +34,8 @@ class ChatUseCases:
             username=username,
             content=content,
             timestamp=time.time(),
-            topic=topic_name
+            topic=topic_name,
+            body=body
         )
         
         await self.repository.add_message(topic_name, message)
@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 
@@ -7,6 +8,36 @@ class Settings(BaseSettings):
     port: int = 8000
     message_ttl: int = 30  # seconds
     debug: bool = False
+    trace_file: Optional[str] = None  # record inbound frames for offline replay
+    
+    # Admission control (0 disables a cap)
+    max_connections: int = 10000
+    max_connections_per_ip: int = 100
+    max_topic_members: int = 1000
+    
+    # Load shedding thresholds, by event-loop lag and pending outbound sends
+    load_sample_interval: float = 0.1  # seconds
+    shed_joins_lag_ms: float = 100
+    shed_commands_lag_ms: float = 250
+    shed_messages_lag_ms: float = 500
+    shed_joins_queue_depth: int = 5000
+    shed_commands_queue_depth: int = 10000
+    shed_messages_queue_depth: int = 20000
+    retry_after: int = 5  # seconds suggested to shed clients
+    
+    # Size limits, in characters
+    max_frame_size: int = 65536  # any single inbound frame
+    max_message_length: int = 1000  # inline messages; larger content uses /upload
+    max_upload_size: int = 4 * 1024 * 1024  # total content of one chunked upload
+    max_upload_buffer: int = 64 * 1024 * 1024  # all uploads in progress, server-wide
+    upload_idle_timeout: float = 30  # seconds before a stalled upload is dropped
+    stream_chunk_size: int = 16384  # fragment size when streaming uploads to recipients
+    
+    @property
+    def ws_max_size(self) -> Optional[int]:
+        """Transport-level frame limit in bytes, or None when frames are unlimited"""
+        # Frame limit is in characters; UTF-8 needs up to 4 bytes each
+        return self.max_frame_size * 4 if self.max_frame_size else None
     
     class Config:
         env_file = ".env"
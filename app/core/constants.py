@@ -1,8 +1,22 @@
 from enum import Enum
+from typing import Optional
 
 
 class Commands(str, Enum):
     LIST = "/list"
+    UPLOAD = "/upload"
+
+
+def split_command(content: str) -> tuple[Optional[Commands], str]:
+    """Split a frame into its command and argument, or (None, "") for chat text"""
+    words = content.split(None, 1)
+    if not words:
+        return None, ""
+    try:
+        command = Commands(words[0])
+    except ValueError:
+        return None, ""
+    return command, words[1] if len(words) > 1 else ""
 
 
 class WebSocketCloseCodes(int, Enum):
@@ -10,11 +24,29 @@ class WebSocketCloseCodes(int, Enum):
     GOING_AWAY = 1001
     INVALID_PAYLOAD = 1007
     POLICY_VIOLATION = 1008
+    MESSAGE_TOO_BIG = 1009
     INTERNAL_ERROR = 1011
+    TRY_AGAIN_LATER = 1013
+
+
+class LoadLevel(int, Enum):
+    NORMAL = 0
+    SHED_JOINS = 1
+    SHED_COMMANDS = 2
+    SHED_MESSAGES = 3
 
 
 class ErrorMessages(str, Enum):
     INVALID_JSON = "Invalid JSON payload"
     USERNAME_REQUIRED = "Username is required"
     TOPIC_REQUIRED = "Topic is required"
-    INVALID_PAYLOAD_FORMAT = "Payload must contain 'username' and 'topic'"
\ No newline at end of file
+    INVALID_PAYLOAD_FORMAT = "Payload must contain 'username' and 'topic'"
+    TOPIC_FULL = "Topic has reached its member limit"
+    SERVER_BUSY = "Server is busy, try again later"
+    FRAME_TOO_LARGE = "Frame exceeds the maximum size"
+    MESSAGE_TOO_LONG = "Message exceeds the maximum length, use /upload <size>"
+    UPLOAD_TOO_LARGE = "Upload exceeds the maximum size"
+    INVALID_UPLOAD = "Usage: /upload <size>"
+    UPLOAD_OVERFLOW = "Upload data exceeds the declared size"
+    UPLOAD_CAPACITY = "Server upload capacity is exhausted, try again later"
+    UPLOAD_EXPIRED = "Upload timed out waiting for data"
\ No newline at end of file
@@ -12,6 +12,36 @@ class User:
     joined_at: datetime = field(default_factory=datetime.now)
 
 
+@dataclass
+class SharedBuffer:
+    """Large message body stored once and shared by every reader.
+
+    The topic's message holds the initial reference; readers such as an
+    in-progress stream acquire their own. The data is dropped when the last
+    reference is released.
+    """
+    data: Optional[str]
+    refs: int = 1
+    
+    @property
+    def size(self) -> int:
+        return len(self.data) if self.data is not None else 0
+    
+    def acquire(self) -> "SharedBuffer":
+        self.refs += 1
+        return self
+    
+    def release(self):
+        self.refs -= 1
+        if self.refs <= 0:
+            self.data = None
+    
+    def fragments(self, size: int):
+        data = self.data or ""
+        for start in range(0, len(data), size):
+            yield data[start:start + size]
+
+
 @dataclass
 class Message:
     username: str
@@ -19,6 +49,7 @@ class Message:
     timestamp: float
     topic: str
     id: str = field(default_factory=lambda: str(uuid.uuid4()))
+    body: Optional[SharedBuffer] = None  # set for chunked uploads, content is then empty
     
     def to_dict(self):
         return {
@@ -50,7 +81,10 @@ class Topic:
         self.messages.append(message)
     
     def remove_expired_messages(self, current_time: float, ttl: int):
-        self.messages = [
-            msg for msg in self.messages 
-            if current_time - msg.timestamp < ttl
-        ]
\ No newline at end of file
+        kept = []
+        for msg in self.messages:
+            if current_time - msg.timestamp < ttl:
+                kept.append(msg)
+            elif msg.body is not None:
+                msg.body.release()
+        self.messages = kept
\ No newline at end of file
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, Optional
+from fastapi import WebSocket
+from ...core.config import Settings
+from ...core.constants import ErrorMessages, LoadLevel, split_command
+
+
+logger = logging.getLogger(__name__)
+
+
+class AdmissionController:
+    """Connection caps and graduated load shedding.
+
+    The load level is derived from event-loop lag (sampled by ``monitor``) and
+    the number of broadcast sends the chat service has queued. As load rises,
+    new joins are rejected first, then commands such as ``/list`` are dropped,
+    and finally messages are refused with a retry-after frame.
+    """
+
+    def __init__(self, chat_service, config: Settings):
+        self.chat_service = chat_service
+        self.config = config
+        self.loop_lag_ms = 0.0
+        self.connection_count = 0
+        self.connections_per_ip: Dict[str, int] = defaultdict(int)
+        self._hosts: Dict[int, str] = {}
+
+    @property
+    def queue_depth(self) -> int:
+        return self.chat_service.pending_sends
+
+    @property
+    def load_level(self) -> LoadLevel:
+        config = self.config
+        lag = self.loop_lag_ms
+        depth = self.queue_depth
+        if lag >= config.shed_messages_lag_ms or depth >= config.shed_messages_queue_depth:
+            return LoadLevel.SHED_MESSAGES
+        if lag >= config.shed_commands_lag_ms or depth >= config.shed_commands_queue_depth:
+            return LoadLevel.SHED_COMMANDS
+        if lag >= config.shed_joins_lag_ms or depth >= config.shed_joins_queue_depth:
+            return LoadLevel.SHED_JOINS
+        return LoadLevel.NORMAL
+
+    def admit(self, websocket: WebSocket) -> bool:
+        """Reserve a connection slot, or return False if the server is saturated"""
+        host = websocket.client.host if websocket.client else "unknown"
+
+        if self.load_level >= LoadLevel.SHED_JOINS:
+            logger.warning(f"Rejecting connection from {host}: server overloaded")
+            return False
+        if self.config.max_connections and self.connection_count >= self.config.max_connections:
+            logger.warning(f"Rejecting connection from {host}: connection limit reached")
+            return False
+        if (self.config.max_connections_per_ip
+                and self.connections_per_ip[host] >= self.config.max_connections_per_ip):
+            logger.warning(f"Rejecting connection from {host}: per-IP limit reached")
+            return False
+
+        self.connection_count += 1
+        self.connections_per_ip[host] += 1
+        self._hosts[id(websocket)] = host
+        return True
+
+    def release(self, websocket: WebSocket) -> None:
+        """Free the slot reserved by admit"""
+        host = self._hosts.pop(id(websocket), None)
+        if host is None:
+            return
+        self.connection_count -= 1
+        self.connections_per_ip[host] -= 1
+        if not self.connections_per_ip[host]:
+            del self.connections_per_ip[host]
+
+    def can_join(self) -> bool:
+        return self.load_level < LoadLevel.SHED_JOINS
+
+    def shed_frame(self, data: str) -> Optional[dict]:
+        """Return a retry-after frame if this inbound frame should be shed"""
+        level = self.load_level
+        if level < LoadLevel.SHED_COMMANDS:
+            return None
+        command, _ = split_command(data)
+        if level < LoadLevel.SHED_MESSAGES and command is None:
+            return None
+        return self.retry_after_frame()
+
+    def retry_after_frame(self) -> dict:
+        return {
+            "type": "retry_after",
+            "error": ErrorMessages.SERVER_BUSY,
+            "retry_after": self.config.retry_after,
+        }
+
+    def stats(self) -> dict:
+        return {
+            "load_level": self.load_level.name.lower(),
+            "loop_lag_ms": round(self.loop_lag_ms, 2),
+            "queue_depth": self.queue_depth,
+            "connections": self.connection_count,
+        }
+
+    async def monitor(self):
+        """Sample event-loop lag until cancelled.
+
+        Spikes register immediately and then halve on every quiet sample, so
+        the load level does not flap between consecutive samples.
+        """
+        loop = asyncio.get_running_loop()
+        interval = self.config.load_sample_interval
+        while True:
+            started = loop.time()
+            await asyncio.sleep(interval)
+            sample = max(loop.time() - started - interval, 0.0) * 1000
+            self.loop_lag_ms = max(sample, self.loop_lag_ms / 2)
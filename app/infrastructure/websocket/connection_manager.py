@@ -1,29 +1,72 @@
 import json
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from fastapi import WebSocket
-from ...core.constants import ErrorMessages
+from ...core.constants import ErrorMessages, WebSocketCloseCodes
+from .admission import AdmissionController
+from .tracing import TraceRecorder
 
 
 logger = logging.getLogger(__name__)
 
 
 class ConnectionManager:
-    def __init__(self, chat_service):
+    def __init__(
+        self,
+        chat_service,
+        recorder: Optional[TraceRecorder] = None,
+        admission: Optional[AdmissionController] = None,
+        max_frame_size: int = 0,
+    ):
         self.chat_service = chat_service
+        self.recorder = recorder
+        self.admission = admission
+        self.max_frame_size = max_frame_size
         self.active_connections: Dict[str, Dict[str, Any]] = {}
     
-    async def connect(self, websocket: WebSocket):
-        """Accept WebSocket connection"""
+    async def connect(self, websocket: WebSocket) -> bool:
+        """Accept WebSocket connection, or reject it when admission control refuses"""
+        if self.admission and not self.admission.admit(websocket):
+            # Closing before accept becomes an HTTP 403; accept so clients see 1013
+            await websocket.accept()
+            await websocket.send_json(self.admission.retry_after_frame())
+            await websocket.close(code=WebSocketCloseCodes.TRY_AGAIN_LATER)
+            return False
+        
         await websocket.accept()
+        if self.recorder:
+            self.recorder.record_open(websocket)
         logger.info("New WebSocket connection established")
+        return True
+    
+    def release(self, websocket: WebSocket):
+        """Free the admission slot held by a connection"""
+        if self.admission:
+            self.admission.release(websocket)
+    
+    async def _receive(self, websocket: WebSocket) -> Optional[str]:
+        """Receive a text frame, recording it when tracing is enabled.
+        
+        Returns None after closing the connection for an oversized frame.
+        """
+        data = await websocket.receive_text()
+        if self.recorder:
+            self.recorder.record_frame(websocket, data)
+        if self.max_frame_size and len(data) > self.max_frame_size:
+            logger.warning(f"Closing connection: {len(data)} character frame exceeds {self.max_frame_size}")
+            await websocket.send_json({"error": ErrorMessages.FRAME_TOO_LARGE})
+            await websocket.close(code=WebSocketCloseCodes.MESSAGE_TOO_BIG)
+            return None
+        return data
     
     async def receive_and_process(self, websocket: WebSocket):
         """Main loop to receive and process messages"""
         connection_info = None
         
         try:
-            data = await websocket.receive_text()
+            data = await self._receive(websocket)
+            if data is None:
+                return
             connection_info = await self._handle_initial_data(websocket, data)
             
             if not connection_info:
@@ -39,7 +82,15 @@ class ConnectionManager:
             logger.info(f"User {username} joined topic {topic}")
             
             while True:
-                data = await websocket.receive_text()
+                data = await self._receive(websocket)
+                if data is None:
+                    return
+                # Frames of an upload already in progress are never shed
+                if self.admission and not self.chat_service.is_uploading(topic, username):
+                    shed = self.admission.shed_frame(data)
+                    if shed:
+                        await websocket.send_json(shed)
+                        continue
                 await self.chat_service.process_message(topic, username, data, websocket)
                 
         except json.JSONDecodeError:
@@ -48,6 +99,8 @@ class ConnectionManager:
         except Exception as e:
             logger.error(f"Error in connection: {e}")
         finally:
+            if self.recorder:
+                self.recorder.record_close(websocket)
             if connection_info:
                 username, topic = connection_info
                 await self._handle_disconnect(username, topic)
@@ -61,6 +114,11 @@ class ConnectionManager:
                 await websocket.send_json({"error": ErrorMessages.INVALID_PAYLOAD_FORMAT})
                 return None
             
+            if self.admission and not self.admission.can_join():
+                await websocket.send_json(self.admission.retry_after_frame())
+                await websocket.close(code=WebSocketCloseCodes.TRY_AGAIN_LATER)
+                return None
+            
             username, topic = await self.chat_service.process_connection(
                 websocket, json_data
             )
@@ -68,7 +126,11 @@ class ConnectionManager:
             return username, topic
             
         except (json.JSONDecodeError, ValueError) as e:
-            await websocket.send_json({"error": str(e)})
+            error = e.args[0] if e.args else None
+            if isinstance(error, ErrorMessages):
+                await websocket.send_json({"error": error.value})
+            else:
+                await websocket.send_json({"error": str(e)})
             return None
     
     async def _handle_disconnect(self, username: str, topic: str):
@@ -12,12 +12,14 @@ class WebSocketHandler:
     
     async def handle_websocket(self, websocket: WebSocket):
         """Handle WebSocket connection lifecycle"""
-        await self.connection_manager.connect(websocket)
-        
         try:
+            if not await self.connection_manager.connect(websocket):
+                return
             await self.connection_manager.receive_and_process(websocket)
         except WebSocketDisconnect:
             logger.info("WebSocket disconnected normally")
         except Exception as e:
             logger.error(f"Unexpected error: {e}")
-            await websocket.close(code=1011)
\ No newline at end of file
+            await websocket.close(code=1011)
+        finally:
+            self.connection_manager.release(websocket)
\ No newline at end of file
@@ -0,0 +1,333 @@
+"""Replay a recorded connection trace against the chat stack without sockets.
+
+Usage::
+
+    python -m app.infrastructure.websocket.replay trace.jsonl.gz [--repeat N]
+
+Traces are produced by setting ``TRACE_FILE`` while the server runs. Frames are
+fed through ``WebSocketHandler``/``ConnectionManager`` using in-memory fake
+websockets, one event at a time and without honouring the recorded delays, so
+two runs over the same trace execute the same code path.
+"""
+import argparse
+import asyncio
+import importlib
+import inspect
+import json
+import logging
+import time
+import tracemalloc
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from fastapi import WebSocketDisconnect
+
+from ...application.services import ChatService
+from ...application.use_cases import ChatUseCases
+from ...core.config import settings
+from ...core.constants import WebSocketCloseCodes
+from ...domain.repository import ChatRepository
+from ..repositories import InMemoryChatRepository
+from .connection_manager import ConnectionManager
+from .handlers import WebSocketHandler
+from .tracing import TraceEvents, read_trace
+
+
+STAGES = ("parse", "repository", "serialize", "fan-out")
+
+_DISCONNECT = object()
+
+
+class StageProfiler:
+    """Accumulate exclusive CPU time per stage.
+
+    Stages nest: time spent in an inner stage is not counted towards the
+    outer one, so the totals add up to the CPU time spent inside any stage.
+    """
+
+    def __init__(self, clock: Callable[[], int] = time.process_time_ns):
+        self.clock = clock
+        self.totals: Dict[str, int] = defaultdict(int)
+        self.calls: Dict[str, int] = defaultdict(int)
+        self._stack: List[str] = []
+        self._mark = 0
+
+    @contextmanager
+    def stage(self, name: str):
+        now = self.clock()
+        if self._stack:
+            self.totals[self._stack[-1]] += now - self._mark
+        self._stack.append(name)
+        self._mark = now
+        try:
+            yield
+        finally:
+            now = self.clock()
+            self.totals[self._stack.pop()] += now - self._mark
+            self.calls[name] += 1
+            self._mark = now
+
+    def wrap(self, name: str, func):
+        if inspect.iscoroutinefunction(func):
+            async def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return await func(*args, **kwargs)
+        else:
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return func(*args, **kwargs)
+        return wrapper
+
+
+class FakeWebSocket:
+    """In-memory stand-in for a Starlette WebSocket"""
+
+    def __init__(self, profiler: Optional[StageProfiler] = None):
+        self.profiler = profiler
+        self.idle = asyncio.Event()
+        self.close_code: Optional[int] = None
+        self.sent_frames = 0
+        self.sent_bytes = 0
+        self._frames: deque = deque()
+        self._waiter: Optional[asyncio.Future] = None
+
+    async def accept(self):
+        pass
+
+    async def receive_text(self) -> str:
+        while not self._frames:
+            self.idle.set()
+            self._waiter = asyncio.get_running_loop().create_future()
+            await self._waiter
+        frame = self._frames.popleft()
+        if frame is _DISCONNECT:
+            raise WebSocketDisconnect(WebSocketCloseCodes.NORMAL_CLOSURE)
+        return frame
+
+    async def send_json(self, data: Any):
+        if self.profiler:
+            with self.profiler.stage("serialize"):
+                text = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+        else:
+            text = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+        self.sent_frames += 1
+        self.sent_bytes += len(text)
+
+    async def send_text(self, data: str):
+        self.sent_frames += 1
+        self.sent_bytes += len(data)
+
+    async def close(self, code: int = WebSocketCloseCodes.NORMAL_CLOSURE):
+        self.close_code = code
+
+    def feed(self, frame) -> None:
+        self.idle.clear()
+        self._frames.append(frame)
+        if self._waiter and not self._waiter.done():
+            self._waiter.set_result(None)
+
+
+class TraceReplayer:
+    """Drive a fresh chat stack with the events of a trace"""
+
+    def __init__(
+        self,
+        events: List[List[Any]],
+        repository_factory: Callable[[], ChatRepository] = InMemoryChatRepository,
+        message_ttl: int = settings.message_ttl,
+    ):
+        self.events = events
+        self.repository_factory = repository_factory
+        self.message_ttl = message_ttl
+
+    def _build(self, profiler: Optional[StageProfiler], counts: Dict[str, int]) -> WebSocketHandler:
+        repository = self.repository_factory()
+        use_cases = ChatUseCases(repository)
+        chat_service = ChatService.from_settings(use_cases, settings, message_ttl=self.message_ttl)
+        connection_manager = ConnectionManager(chat_service, max_frame_size=settings.max_frame_size)
+
+        # Only frames that end up stored as chat messages count towards per-message
+        # figures; commands and upload control/data frames are reported separately
+        handle_message = use_cases.handle_message
+
+        async def counted_handle_message(*args, **kwargs):
+            message = await handle_message(*args, **kwargs)
+            if message:
+                counts["messages"] += 1
+            return message
+
+        use_cases.handle_message = counted_handle_message
+
+        if profiler:
+            for name in ChatRepository.__abstractmethods__:
+                setattr(repository, name, profiler.wrap("repository", getattr(repository, name)))
+            chat_service.process_message = profiler.wrap("parse", chat_service.process_message)
+            chat_service._broadcast_message = profiler.wrap("fan-out", chat_service._broadcast_message)
+            # Stream frames are encoded once by the service rather than per send_json
+            chat_service._serialize_frame = profiler.wrap("serialize", chat_service._serialize_frame)
+            connection_manager._handle_initial_data = profiler.wrap(
+                "parse", connection_manager._handle_initial_data
+            )
+
+        return WebSocketHandler(connection_manager)
+
+    async def _run(self, profiler: Optional[StageProfiler] = None, on_frame=None) -> Dict[str, int]:
+        counts = {"connections": 0, "frames": 0, "joins": 0, "messages": 0}
+        handler = self._build(profiler, counts)
+        sockets: Dict[int, FakeWebSocket] = {}
+        tasks: Dict[int, asyncio.Task] = {}
+        frames_seen: Dict[int, int] = defaultdict(int)
+
+        for event in self.events:
+            connection_id, kind = event[1], event[2]
+
+            if kind == TraceEvents.OPEN:
+                websocket = FakeWebSocket(profiler)
+                task = asyncio.create_task(handler.handle_websocket(websocket))
+                task.add_done_callback(lambda _, ws=websocket: ws.idle.set())
+                sockets[connection_id] = websocket
+                tasks[connection_id] = task
+                counts["connections"] += 1
+                await websocket.idle.wait()
+
+            elif kind == TraceEvents.FRAME:
+                task = tasks.get(connection_id)
+                if task is None or task.done():
+                    continue
+                websocket = sockets[connection_id]
+                counts["frames"] += 1
+                # The first frame on a connection is the join payload
+                is_join = frames_seen[connection_id] == 0
+                frames_seen[connection_id] += 1
+                if is_join:
+                    counts["joins"] += 1
+                elif on_frame:
+                    with on_frame(counts):
+                        websocket.feed(event[3])
+                        await websocket.idle.wait()
+                    continue
+                websocket.feed(event[3])
+                await websocket.idle.wait()
+
+            elif kind == TraceEvents.CLOSE:
+                task = tasks.pop(connection_id, None)
+                websocket = sockets.pop(connection_id, None)
+                if task is not None and not task.done():
+                    websocket.feed(_DISCONNECT)
+                    await task
+
+        for connection_id, task in tasks.items():
+            if not task.done():
+                sockets[connection_id].feed(_DISCONNECT)
+                await task
+
+        # Drop pending message-expiry timers scheduled by ChatService
+        current = asyncio.current_task()
+        pending = [t for t in asyncio.all_tasks() if t is not current]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+        return counts
+
+    def profile(self) -> Dict[str, Any]:
+        """Replay once and report CPU time per stage"""
+        profiler = StageProfiler()
+        started_wall = time.perf_counter()
+        started_cpu = time.process_time_ns()
+        counts = asyncio.run(self._run(profiler))
+        cpu_ns = time.process_time_ns() - started_cpu
+        wall = time.perf_counter() - started_wall
+
+        stages = {name: profiler.totals.get(name, 0) for name in STAGES}
+        stages["other"] = max(cpu_ns - sum(stages.values()), 0)
+        return {**counts, "wall_seconds": wall, "cpu_ns": cpu_ns, "stages_ns": stages}
+
+    def measure_allocations(self) -> Dict[str, float]:
+        """Replay once under tracemalloc and report memory allocated per message"""
+        peak_bytes = 0
+        retained_bytes = 0
+
+        @contextmanager
+        def track(counts):
+            nonlocal peak_bytes, retained_bytes
+            messages = counts["messages"]
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            yield
+            after, peak = tracemalloc.get_traced_memory()
+            # Skip commands and upload frames that did not store a message
+            if counts["messages"] > messages:
+                peak_bytes += peak - before
+                retained_bytes += after - before
+
+        tracemalloc.start()
+        try:
+            counts = asyncio.run(self._run(on_frame=track))
+        finally:
+            tracemalloc.stop()
+
+        messages = counts["messages"] or 1
+        return {
+            "peak_bytes_per_message": peak_bytes / messages,
+            "retained_bytes_per_message": retained_bytes / messages,
+        }
+
+
+def _format_report(report: Dict[str, Any]) -> str:
+    messages = report["messages"] or 1
+    cpu_ns = report["cpu_ns"] or 1
+    lines = [
+        f"connections: {report['connections']}  frames: {report['frames']}  joins: {report['joins']}  "
+        f"messages: {report['messages']}  "
+        f"other frames: {report['frames'] - report['joins'] - report['messages']}",
+        f"wall: {report['wall_seconds'] * 1000:.1f} ms  "
+        f"throughput: {report['frames'] / report['wall_seconds'] if report['wall_seconds'] else 0:.0f} frames/s",
+        f"{'stage':<12}{'cpu ms':>10}{'us/msg':>10}{'share':>8}",
+    ]
+    for name, ns in report["stages_ns"].items():
+        lines.append(
+            f"{name:<12}{ns / 1e6:>10.2f}{ns / 1e3 / messages:>10.2f}{ns * 100 / cpu_ns:>7.1f}%"
+        )
+    if "allocations" in report:
+        allocations = report["allocations"]
+        lines.append(
+            f"allocations: {allocations['peak_bytes_per_message']:.0f} B peak/msg, "
+            f"{allocations['retained_bytes_per_message']:.0f} B retained/msg"
+        )
+    return "\n".join(lines)
+
+
+def _load_factory(path: str) -> Callable[[], ChatRepository]:
+    module_name, _, attr = path.partition(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Replay a chat connection trace")
+    parser.add_argument("trace", help="trace file recorded via TRACE_FILE")
+    parser.add_argument("--repeat", type=int, default=1, help="number of timed replays")
+    parser.add_argument(
+        "--repository",
+        default="app.infrastructure.repositories:InMemoryChatRepository",
+        help="repository implementation as module:Class",
+    )
+    parser.add_argument("--no-alloc", action="store_true", help="skip the tracemalloc pass")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    # Disconnects surface as errors in ConnectionManager; keep the report readable
+    logging.disable(logging.ERROR)
+
+    replayer = TraceReplayer(read_trace(args.trace), _load_factory(args.repository))
+    runs = [replayer.profile() for _ in range(max(args.repeat, 1))]
+    report = min(runs, key=lambda run: run["cpu_ns"])
+    if not args.no_alloc:
+        report["allocations"] = replayer.measure_allocations()
+
+    print(json.dumps(report, indent=2) if args.json else _format_report(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import gzip
+import json
+import time
+from typing import Any, Dict, List, Optional
+
+
+class TraceEvents:
+    OPEN = "o"
+    FRAME = "f"
+    CLOSE = "c"
+
+
+def _open_trace(path: str, mode: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+
+class TraceRecorder:
+    """Record connection events and inbound frames to a compact trace file.
+
+    Each line is a JSON array ``[offset, connection_id, event, payload]`` where
+    ``offset`` is seconds since recording started. Paths ending in ``.gz`` are
+    gzip-compressed. Output is flushed every ``flush_interval`` seconds so a
+    killed server still leaves a readable trace up to the last flush.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0):
+        self.path = path
+        self.flush_interval = flush_interval
+        self._file = _open_trace(path, "w")
+        self._started = time.monotonic()
+        self._last_flush = self._started
+        self._connection_ids: Dict[int, int] = {}
+        self._next_id = 0
+
+    def _write(self, connection_id: int, event: str, payload: Optional[str] = None):
+        if self._file is None:
+            return
+        now = time.monotonic()
+        record = [round(now - self._started, 6), connection_id, event]
+        if payload is not None:
+            record.append(payload)
+        self._file.write(json.dumps(record, separators=(",", ":"), ensure_ascii=False))
+        self._file.write("\n")
+        if now - self._last_flush >= self.flush_interval:
+            self._file.flush()
+            self._last_flush = now
+
+    def record_open(self, websocket) -> None:
+        self._next_id += 1
+        self._connection_ids[id(websocket)] = self._next_id
+        self._write(self._next_id, TraceEvents.OPEN)
+
+    def record_frame(self, websocket, data: str) -> None:
+        connection_id = self._connection_ids.get(id(websocket))
+        if connection_id is not None:
+            self._write(connection_id, TraceEvents.FRAME, data)
+
+    def record_close(self, websocket) -> None:
+        connection_id = self._connection_ids.pop(id(websocket), None)
+        if connection_id is not None:
+            self._write(connection_id, TraceEvents.CLOSE)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def read_trace(path: str) -> List[List[Any]]:
+    """Load all events from a trace file written by TraceRecorder.
+
+    A trace cut short by a killed server is read up to its last complete line.
+    """
+    events = []
+    with _open_trace(path, "r") as f:
+        try:
+            for line in f:
+                if line.endswith("\n"):
+                    events.append(json.loads(line))
+        except EOFError:
+            pass
+    return events
+
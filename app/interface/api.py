@@ -3,6 +3,8 @@ from fastapi.responses import HTMLResponse
 import logging
 from ..infrastructure.websocket.handlers import WebSocketHandler
 from ..infrastructure.websocket.connection_manager import ConnectionManager
+from ..infrastructure.websocket.admission import AdmissionController
+from ..infrastructure.websocket.tracing import TraceRecorder
 from ..infrastructure.repositories import InMemoryChatRepository
 from ..application.use_cases import ChatUseCases
 from ..application.services import ChatService
@@ -20,14 +22,24 @@ def create_app() -> FastAPI:
     # Initialize dependencies
     repository = InMemoryChatRepository()
     use_cases = ChatUseCases(repository)
-    chat_service = ChatService(use_cases, settings.message_ttl)
-    connection_manager = ConnectionManager(chat_service)
+    chat_service = ChatService.from_settings(use_cases, settings)
+    admission = AdmissionController(chat_service, settings)
+    recorder = TraceRecorder(settings.trace_file) if settings.trace_file else None
+    connection_manager = ConnectionManager(chat_service, recorder, admission, settings.max_frame_size)
     websocket_handler = WebSocketHandler(connection_manager)
     
     # Start cleanup task
     @app.on_event("startup")
     async def startup_event():
         asyncio.create_task(use_cases.cleanup_expired_messages(settings.message_ttl))
+        asyncio.create_task(admission.monitor())
+        if recorder:
+            logger.info(f"Recording connection trace to {recorder.path}")
+    
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        if recorder:
+            recorder.close()
     
     @app.get("/")
     async def root():
@@ -35,7 +47,7 @@ def create_app() -> FastAPI:
     
     @app.get("/health")
     async def health_check():
-        return {"status": "healthy"}
+        return {"status": "healthy", "load": admission.stats()}
     
     @app.get("/topics")
     async def list_topics():
@@ -87,6 +99,7 @@ def create_app() -> FastAPI:
             
             <script>
                 let ws = null;
+                const streams = {};
                 
                 function connect() {
                     const username = document.getElementById('username').value;
@@ -109,7 +122,15 @@ def create_app() -> FastAPI:
                     
                     ws.onmessage = function(event) {
                         const data = JSON.parse(event.data);
-                        if (data.type === 'topic_list') {
+                        if (data.type === 'message_start') {
+                            streams[data.message_id] = { username: data.username, parts: [] };
+                        } else if (data.type === 'message_chunk') {
+                            streams[data.message_id].parts.push(data.data);
+                        } else if (data.type === 'message_end') {
+                            const stream = streams[data.message_id];
+                            delete streams[data.message_id];
+                            addMessage(`${stream.username}: ${stream.parts.join('')}`);
+                        } else if (data.type === 'topic_list') {
                             addMessage('Active Topics: ' + data.topics.join(', '));
                         } else if (data.type === 'acknowledgment') {
                             addMessage('System: Message delivered');
@@ -6,8 +6,9 @@ app = create_app()
 
 if __name__ == "__main__":
     uvicorn.run(
-        "src.main:app",
+        "app.main:app",
         host=settings.host,
         port=settings.port,
-        reload=settings.debug
+        reload=settings.debug,
+        ws_max_size=settings.ws_max_size
     )
\ No newline at end of file
@@ -19,17 +19,35 @@ async def chat_client(username: str, topic: str, server_url: str = "ws://localho
         
         # Start receiving messages
         async def receive_messages():
+            # Large messages arrive as message_start, message_chunk..., message_end
+            streams = {}
             while True:
                 try:
                     message = await websocket.recv()
                     data = json.loads(message)
+                    message_type = data.get("type")
                     
-                    if data.get("type") == "topic_list":
+                    if message_type == "topic_list":
                         print("\nActive Topics:")
                         for topic_info in data.get("topics", []):
                             print(f"  - {topic_info}")
-                    elif data.get("type") == "acknowledgment":
+                    elif message_type == "acknowledgment":
                         print(f"Message delivered at {data.get('timestamp')}")
+                    elif message_type == "message_start":
+                        streams[data["message_id"]] = {"username": data.get("username"), "parts": []}
+                    elif message_type == "message_chunk":
+                        if data["message_id"] in streams:
+                            streams[data["message_id"]]["parts"].append(data.get("data", ""))
+                    elif message_type == "message_end":
+                        stream = streams.pop(data["message_id"], None)
+                        if stream:
+                            print(f"\n{stream['username']}: {''.join(stream['parts'])}")
+                    elif message_type == "upload_ready":
+                        print(f"Ready to receive {data.get('size')} characters")
+                    elif message_type == "retry_after":
+                        print(f"\n{data.get('error')} (retry in {data.get('retry_after')}s)")
+                    elif "error" in data:
+                        print(f"\nError: {data['error']}")
                     else:
                         print(f"\n{data.get('username')}: {data.get('message')}")
                 except websockets.exceptions.ConnectionClosed:
@@ -0,0 +1,86 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from app.application.services import ChatService
+from app.application.use_cases import ChatUseCases
+from app.core.config import Settings
+from app.infrastructure.repositories import InMemoryChatRepository
+from app.infrastructure.websocket.admission import AdmissionController
+from app.infrastructure.websocket.connection_manager import ConnectionManager
+from app.infrastructure.websocket.handlers import WebSocketHandler
+from app.infrastructure.websocket.replay import FakeWebSocket, _DISCONNECT
+
+
+def make_settings(**overrides) -> Settings:
+    values = dict(
+        max_connections=10,
+        max_connections_per_ip=5,
+        max_topic_members=0,
+        shed_joins_lag_ms=100,
+        shed_commands_lag_ms=250,
+        shed_messages_lag_ms=500,
+        shed_joins_queue_depth=50,
+        shed_commands_queue_depth=100,
+        shed_messages_queue_depth=200,
+        retry_after=3,
+    )
+    values.update(overrides)
+    return Settings(**values)
+
+
+class ClientWebSocket(FakeWebSocket):
+    """FakeWebSocket that keeps every frame sent to the client"""
+
+    def __init__(self, host: str = "10.0.0.1"):
+        super().__init__()
+        self.client = SimpleNamespace(host=host)
+        self.received = []
+        self.task = None
+
+    async def send_json(self, data):
+        self.received.append(json.loads(json.dumps(data)))
+
+    async def send_text(self, data: str):
+        self.received.append(json.loads(data))
+
+    @property
+    def is_open(self) -> bool:
+        return self.close_code is None and not self.task.done()
+
+
+class Server:
+    def __init__(self, config: Settings, **service_options):
+        self.chat_service = ChatService.from_settings(
+            ChatUseCases(InMemoryChatRepository()), config, **service_options
+        )
+        self.admission = AdmissionController(self.chat_service, config)
+        self.handler = WebSocketHandler(ConnectionManager(
+            self.chat_service, admission=self.admission, max_frame_size=config.max_frame_size
+        ))
+        self.sockets = []
+
+    async def connect(self, username: str, topic: str = "general", host: str = "10.0.0.1"):
+        websocket = ClientWebSocket(host)
+        websocket.task = asyncio.create_task(self.handler.handle_websocket(websocket))
+        websocket.task.add_done_callback(lambda _: websocket.idle.set())
+        self.sockets.append(websocket)
+        await websocket.idle.wait()
+        if not websocket.task.done():
+            await self.send(websocket, json.dumps({"username": username, "topic": topic}))
+        return websocket
+
+    async def send(self, websocket: ClientWebSocket, data: str):
+        websocket.feed(data)
+        await websocket.idle.wait()
+
+    async def close(self):
+        for websocket in self.sockets:
+            if not websocket.task.done():
+                websocket.feed(_DISCONNECT)
+                await websocket.task
+        current = asyncio.current_task()
+        pending = [task for task in asyncio.all_tasks() if task is not current]
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
@@ -0,0 +1,178 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from app.core.constants import ErrorMessages, LoadLevel, WebSocketCloseCodes
+from app.infrastructure.websocket.replay import _DISCONNECT
+
+from .support import ClientWebSocket, Server, make_settings
+
+
+def test_connection_caps():
+    async def scenario():
+        server = Server(make_settings(max_connections=3, max_connections_per_ip=2))
+
+        first = await server.connect("a", host="10.0.0.1")
+        second = await server.connect("b", host="10.0.0.1")
+        same_ip = await server.connect("c", host="10.0.0.1")
+        third = await server.connect("d", host="10.0.0.2")
+        over_total = await server.connect("e", host="10.0.0.3")
+
+        assert first.is_open and second.is_open and third.is_open
+        for rejected in (same_ip, over_total):
+            assert rejected.close_code == WebSocketCloseCodes.TRY_AGAIN_LATER
+            assert rejected.received[-1]["type"] == "retry_after"
+
+        # A released slot can be reused
+        await server.send(first, _DISCONNECT)
+        assert (await server.connect("f", host="10.0.0.3")).is_open
+        assert server.admission.connection_count == 3
+
+        await server.close()
+        assert server.admission.connection_count == 0
+        assert not server.admission.connections_per_ip
+
+    asyncio.run(scenario())
+
+
+def test_topic_member_cap():
+    async def scenario():
+        config = make_settings()
+        server = Server(config)
+        server.chat_service.max_topic_members = 1
+
+        member = await server.connect("a", topic="small")
+        extra = await server.connect("b", topic="small")
+
+        assert member.is_open
+        assert extra.task.done()
+        assert extra.received == [{"error": ErrorMessages.TOPIC_FULL.value}]
+
+        await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_join_errors_are_sent_once():
+    async def scenario():
+        server = Server(make_settings())
+        missing_username = await server.connect("", topic="general")
+
+        assert missing_username.task.done()
+        assert missing_username.received == [{"error": ErrorMessages.USERNAME_REQUIRED.value}]
+
+        await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_join_refused_after_accept_closes_with_try_again_later():
+    async def scenario():
+        config = make_settings()
+        server = Server(config)
+
+        # Accepted while load is normal, but load rises before the join payload
+        websocket = ClientWebSocket()
+        websocket.task = asyncio.create_task(server.handler.handle_websocket(websocket))
+        websocket.task.add_done_callback(lambda _: websocket.idle.set())
+        server.sockets.append(websocket)
+        await websocket.idle.wait()
+
+        server.admission.loop_lag_ms = config.shed_joins_lag_ms
+        await server.send(websocket, json.dumps({"username": "late", "topic": "general"}))
+
+        assert websocket.received[-1]["type"] == "retry_after"
+        assert websocket.close_code == WebSocketCloseCodes.TRY_AGAIN_LATER
+        assert websocket.task.done()
+        assert server.admission.connection_count == 0
+
+        await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_monitor_detects_loop_lag_and_decays():
+    async def scenario():
+        config = make_settings(load_sample_interval=0.01, shed_joins_lag_ms=50)
+        server = Server(config)
+        monitor = asyncio.create_task(server.admission.monitor())
+        await asyncio.sleep(0.05)
+        assert server.admission.load_level == LoadLevel.NORMAL
+
+        # Block the event loop so the next sample arrives late
+        time.sleep(0.15)
+        await asyncio.sleep(0.001)
+        spike = server.admission.loop_lag_ms
+        assert spike >= 100
+        assert server.admission.load_level >= LoadLevel.SHED_JOINS
+
+        await asyncio.sleep(0.015)
+        assert server.admission.loop_lag_ms < spike
+
+        await asyncio.sleep(0.2)
+        assert server.admission.load_level == LoadLevel.NORMAL
+
+        monitor.cancel()
+        await server.close()
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize("signal", ["lag", "queue"])
+def test_graduated_shedding_keeps_admitted_connections_responsive(signal):
+    config = make_settings()
+    thresholds = {
+        "lag": {
+            LoadLevel.NORMAL: 0,
+            LoadLevel.SHED_JOINS: config.shed_joins_lag_ms,
+            LoadLevel.SHED_COMMANDS: config.shed_commands_lag_ms,
+            LoadLevel.SHED_MESSAGES: config.shed_messages_lag_ms,
+        },
+        "queue": {
+            LoadLevel.NORMAL: 0,
+            LoadLevel.SHED_JOINS: config.shed_joins_queue_depth,
+            LoadLevel.SHED_COMMANDS: config.shed_commands_queue_depth,
+            LoadLevel.SHED_MESSAGES: config.shed_messages_queue_depth,
+        },
+    }[signal]
+
+    async def scenario():
+        server = Server(config)
+        alice = await server.connect("alice")
+        bob = await server.connect("bob")
+
+        for level, value in thresholds.items():
+            if signal == "lag":
+                server.admission.loop_lag_ms = value
+            else:
+                server.chat_service.pending_sends = value
+            assert server.admission.load_level == level
+
+            newcomer = await server.connect(f"new-{level.name}", host="10.0.0.9")
+            if level >= LoadLevel.SHED_JOINS:
+                assert newcomer.close_code == WebSocketCloseCodes.TRY_AGAIN_LATER
+                assert newcomer.received[-1]["type"] == "retry_after"
+            else:
+                assert newcomer.is_open
+
+            replies = len(alice.received)
+            await server.send(alice, "/list")
+            assert len(alice.received) == replies + 1
+            expected = "retry_after" if level >= LoadLevel.SHED_COMMANDS else "topic_list"
+            assert alice.received[-1]["type"] == expected
+
+            replies = len(alice.received)
+            await server.send(alice, f"hello at {level.name}")
+            assert len(alice.received) == replies + 1
+            expected = "retry_after" if level >= LoadLevel.SHED_MESSAGES else "acknowledgment"
+            assert alice.received[-1]["type"] == expected
+            if expected == "retry_after":
+                assert alice.received[-1]["retry_after"] == config.retry_after
+
+            assert alice.is_open and bob.is_open
+
+        await server.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,118 @@
+import asyncio
+import shutil
+
+from app.infrastructure.websocket.replay import StageProfiler, TraceReplayer, _DISCONNECT
+from app.infrastructure.websocket.tracing import TraceEvents, TraceRecorder, read_trace
+
+from .support import Server, make_settings
+
+
+COUNTS = ("connections", "frames", "joins", "messages")
+
+
+def record_session(path: str, flush_interval: float = 1.0) -> TraceRecorder:
+    """Record two users chatting; the recorder is returned still open"""
+    recorder = TraceRecorder(path, flush_interval)
+
+    async def scenario():
+        server = Server(make_settings())
+        server.handler.connection_manager.recorder = recorder
+        alice = await server.connect("alice")
+        bob = await server.connect("bob")
+        for i in range(3):
+            await server.send(alice, f"hello {i}")
+            await server.send(bob, f"reply {i}")
+        await server.send(alice, "/list")
+        await server.send(bob, _DISCONNECT)
+        await server.close()
+
+    asyncio.run(scenario())
+    return recorder
+
+
+def test_recorded_session_replays_with_expected_counts(tmp_path):
+    path = str(tmp_path / "trace.jsonl")
+    record_session(path).close()
+
+    report = TraceReplayer(read_trace(path)).profile()
+
+    assert report["connections"] == 2
+    assert report["joins"] == 2
+    assert report["messages"] == 6
+    # Six messages and one /list besides the joins
+    assert report["frames"] == 9
+
+
+def test_replays_of_the_same_trace_are_deterministic(tmp_path):
+    path = str(tmp_path / "trace.jsonl.gz")
+    record_session(path).close()
+    replayer = TraceReplayer(read_trace(path))
+
+    first, second = replayer.profile(), replayer.profile()
+
+    assert {name: first[name] for name in COUNTS} == {name: second[name] for name in COUNTS}
+
+
+def test_nested_stages_are_not_double_counted():
+    now = 0
+    profiler = StageProfiler(clock=lambda: now)
+
+    with profiler.stage("fan-out"):
+        now += 5
+        with profiler.stage("serialize"):
+            now += 3
+        now += 2
+
+    assert profiler.totals == {"fan-out": 7, "serialize": 3}
+    assert sum(profiler.totals.values()) == now
+    assert profiler.calls == {"fan-out": 1, "serialize": 1}
+
+
+def test_truncated_gzip_trace_loads_up_to_last_complete_line(tmp_path):
+    path = str(tmp_path / "trace.jsonl.gz")
+    recorder = record_session(path, flush_interval=0)
+
+    # Copy the file as a killed server would leave it: no gzip trailer
+    killed = str(tmp_path / "killed.jsonl.gz")
+    shutil.copyfile(path, killed)
+    recorder.close()
+    complete = read_trace(path)
+
+    events = read_trace(killed)
+    assert events == complete[:len(events)]
+    assert len(events) >= len(complete) - 1
+    assert events[0][2] == TraceEvents.OPEN
+
+    # Cutting into the compressed data still yields a readable prefix
+    with open(killed, "rb") as f:
+        data = f.read()
+    with open(killed, "wb") as f:
+        f.write(data[:-40])
+    events = read_trace(killed)
+    assert 0 < len(events) < len(complete)
+    assert events == complete[:len(events)]
+
+
+def test_stream_frames_are_profiled_as_serialize(tmp_path):
+    path = str(tmp_path / "trace.jsonl")
+    recorder = TraceRecorder(path)
+
+    async def scenario():
+        server = Server(make_settings())
+        server.handler.connection_manager.recorder = recorder
+        sender = await server.connect("sender")
+        await server.connect("listener")
+        await server.send(sender, "/upload 40000")
+        await server.send(sender, "x" * 40000)
+        await server.close()
+
+    asyncio.run(scenario())
+    recorder.close()
+
+    profiler = StageProfiler()
+    replayer = TraceReplayer(read_trace(path))
+    counts = asyncio.run(replayer._run(profiler))
+
+    assert counts["messages"] == 1
+    # message_start, three 16 KiB chunks and message_end
+    assert profiler.calls["serialize"] >= 5
@@ -0,0 +1,363 @@
+import asyncio
+import json
+import logging
+import time
+
+from app.application.services import ChatService
+from app.application.use_cases import ChatUseCases
+from app.core.constants import ErrorMessages, LoadLevel, WebSocketCloseCodes
+from app.infrastructure.repositories import InMemoryChatRepository
+from app.infrastructure.websocket.tracing import TraceEvents, TraceRecorder, read_trace
+
+from .support import Server, make_settings
+
+
+async def upload(server, websocket, body: str, frame_size: int = 10000):
+    await server.send(websocket, f"/upload {len(body)}")
+    for start in range(0, len(body), frame_size):
+        await server.send(websocket, body[start:start + frame_size])
+
+
+def test_streamed_upload_reassembles_for_every_recipient():
+    async def scenario():
+        server = Server(make_settings(), stream_chunk_size=4096)
+        sender = await server.connect("sender")
+        recipients = [await server.connect(f"r{i}") for i in range(3)]
+        body = "é" * 20000
+
+        await upload(server, sender, body)
+
+        assert sender.received[-1]["type"] == "acknowledgment"
+        for recipient in recipients:
+            frames = [f for f in recipient.received if f.get("type", "").startswith("message_")]
+            assert frames[0]["type"] == "message_start" and frames[0]["size"] == len(body)
+            assert frames[-1]["type"] == "message_end"
+            assert "".join(f["data"] for f in frames if f["type"] == "message_chunk") == body
+        assert server.chat_service.pending_sends == 0
+
+        await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_stream_counts_only_fragment_in_flight_as_queued():
+    async def scenario():
+        config = make_settings(
+            max_connections=0,
+            max_connections_per_ip=0,
+            shed_joins_queue_depth=100,
+            shed_commands_queue_depth=200,
+            shed_messages_queue_depth=300,
+        )
+        server = Server(config, stream_chunk_size=1024)
+        sender = await server.connect("sender")
+        recipients = [await server.connect(f"r{i}") for i in range(80)]
+        observed = []
+
+        for recipient in recipients:
+            async def send_text(data, recipient=recipient):
+                observed.append(server.chat_service.pending_sends)
+                recipient.received.append(data)
+            recipient.send_text = send_text
+
+        # 64 fragments x 80 recipients would be far over every queue threshold
+        await upload(server, sender, "x" * 64 * 1024)
+
+        assert max(observed) <= len(recipients)
+        assert server.admission.load_level == LoadLevel.NORMAL
+        assert server.chat_service.pending_sends == 0
+
+        await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_upload_is_shed_with_other_commands():
+    async def scenario():
+        config = make_settings()
+        server = Server(config)
+        sender = await server.connect("sender")
+
+        server.admission.loop_lag_ms = config.shed_commands_lag_ms
+        await server.send(sender, "/upload 10")
+        assert sender.received[-1]["type"] == "retry_after"
+        assert not server.chat_service.is_uploading("general", "sender")
+
+        await server.send(sender, "plain message")
+        assert sender.received[-1]["type"] == "acknowledgment"
+
+        await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_upload_budget_rejects_uploads_until_released():
+    async def scenario():
+        server = Server(make_settings(), max_upload_buffer=1000)
+        first = await server.connect("first")
+        second = await server.connect("second")
+
+        await server.send(first, "/upload 800")
+        assert first.received[-1]["type"] == "upload_ready"
+
+        await server.send(second, "/upload 300")
+        assert "error" in second.received[-1]
+        assert server.chat_service.upload_reserved == 800
+
+        await server.send(first, "x" * 800)
+        assert first.received[-1]["type"] == "acknowledgment"
+        assert server.chat_service.upload_reserved == 0
+
+        await server.send(second, "/upload 300")
+        assert second.received[-1]["type"] == "upload_ready"
+
+        await server.close()
+        assert server.chat_service.upload_reserved == 0
+
+    asyncio.run(scenario())
+
+
+def test_idle_upload_expires_and_frees_budget():
+    async def scenario():
+        server = Server(make_settings(), max_upload_buffer=1000, upload_idle_timeout=5)
+        stalled = await server.connect("stalled")
+        other = await server.connect("other")
+
+        await server.send(stalled, "/upload 1000")
+        server.chat_service.uploads[("general", "stalled")].last_activity -= 10
+
+        await server.send(other, "/upload 500")
+        assert other.received[-1]["type"] == "upload_ready"
+        assert server.chat_service.uploads[("general", "stalled")].expired
+        assert server.chat_service.upload_reserved == 500
+
+        await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_oversized_frame_closes_connection_cleanly(caplog):
+    async def scenario():
+        server = Server(make_settings(max_frame_size=100))
+        sender = await server.connect("sender")
+
+        await server.send(sender, "x" * 101)
+
+        assert sender.received[-1] == {"error": ErrorMessages.FRAME_TOO_LARGE.value}
+        assert sender.close_code == WebSocketCloseCodes.MESSAGE_TOO_BIG
+        assert sender.task.done()
+        assert server.admission.connection_count == 0
+
+        await server.close()
+
+    with caplog.at_level(logging.WARNING):
+        asyncio.run(scenario())
+    assert not [record for record in caplog.records if record.levelno >= logging.ERROR]
+    assert any("exceeds 100" in record.getMessage() for record in caplog.records)
+
+
+def test_oversized_frame_is_recorded_for_replay(tmp_path):
+    path = str(tmp_path / "trace.jsonl")
+
+    async def scenario():
+        server = Server(make_settings(max_frame_size=100))
+        server.handler.connection_manager.recorder = TraceRecorder(path)
+        sender = await server.connect("sender")
+        await server.send(sender, "x" * 101)
+        await server.close()
+        server.handler.connection_manager.recorder.close()
+
+    asyncio.run(scenario())
+    frames = [event for event in read_trace(path) if event[2] == TraceEvents.FRAME]
+    assert frames[-1][3] == "x" * 101
+
+
+def test_commands_are_matched_the_same_way_everywhere():
+    async def scenario():
+        config = make_settings()
+        server = Server(config)
+        sender = await server.connect("sender")
+
+        await server.send(sender, "/upload\t10")
+        assert sender.received[-1] == {"type": "upload_ready", "size": 10}
+        await server.send(sender, "x" * 10)
+        assert sender.received[-1]["type"] == "acknowledgment"
+
+        server.admission.loop_lag_ms = config.shed_commands_lag_ms
+        await server.send(sender, "/upload\t10")
+        assert sender.received[-1]["type"] == "retry_after"
+
+        await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_frames_of_expired_upload_are_discarded_not_broadcast():
+    async def scenario():
+        server = Server(make_settings(), upload_idle_timeout=5)
+        sender = await server.connect("sender")
+        listener = await server.connect("listener")
+
+        await server.send(sender, "/upload 3000")
+        server.chat_service.uploads[("general", "sender")].last_activity -= 10
+
+        await server.send(sender, "a" * 1000)
+        assert sender.received[-1] == {"error": ErrorMessages.UPLOAD_EXPIRED.value}
+        assert server.chat_service.upload_reserved == 0
+
+        replies = len(sender.received)
+        await server.send(sender, "tail of upload")
+        await server.send(sender, "b" * (2000 - len("tail of upload")))
+        assert len(sender.received) == replies
+        assert listener.received == []
+        assert not server.chat_service.is_uploading("general", "sender")
+
+        # Once the declared size has passed, chat works again
+        await server.send(sender, "back to chat")
+        assert sender.received[-1]["type"] == "acknowledgment"
+        assert listener.received[-1]["message"] == "back to chat"
+
+        await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_new_upload_replaces_expired_one():
+    async def scenario():
+        server = Server(make_settings(), upload_idle_timeout=5)
+        sender = await server.connect("sender")
+        listener = await server.connect("listener")
+
+        await server.send(sender, "/upload 3000")
+        server.chat_service.uploads[("general", "sender")].last_activity -= 10
+
+        await server.send(sender, "/upload 5")
+        assert sender.received[-1] == {"type": "upload_ready", "size": 5}
+        await server.send(sender, "fresh")
+        assert sender.received[-1]["type"] == "acknowledgment"
+        assert server.chat_service.upload_reserved == 0
+
+        await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_service_limits_come_from_settings():
+    config = make_settings(max_upload_size=111, max_upload_buffer=222, upload_idle_timeout=7)
+    service = ChatService.from_settings(ChatUseCases(InMemoryChatRepository()), config, message_ttl=5)
+
+    assert service.max_upload_size == 111
+    assert service.max_upload_buffer == 222
+    assert service.upload_idle_timeout == 7
+    assert service.max_message_length == config.max_message_length
+    assert service.stream_chunk_size == config.stream_chunk_size
+    assert service.message_ttl == 5
+
+
+def test_message_longer_than_limit_is_rejected():
+    async def scenario():
+        server = Server(make_settings(max_message_length=10))
+        sender = await server.connect("sender")
+        listener = await server.connect("listener")
+
+        await server.send(sender, "x" * 11)
+        assert sender.received[-1] == {"error": ErrorMessages.MESSAGE_TOO_LONG.value}
+        assert listener.received == []
+
+        await server.send(sender, "x" * 10)
+        assert sender.received[-1]["type"] == "acknowledgment"
+
+        await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_invalid_and_oversized_upload_arguments_are_rejected():
+    async def scenario():
+        server = Server(make_settings(max_upload_size=100))
+        sender = await server.connect("sender")
+
+        for command in ("/upload", "/upload abc", "/upload 0", "/upload -5"):
+            await server.send(sender, command)
+            assert sender.received[-1] == {"error": ErrorMessages.INVALID_UPLOAD.value}, command
+
+        await server.send(sender, "/upload 101")
+        assert sender.received[-1] == {"error": ErrorMessages.UPLOAD_TOO_LARGE.value}
+
+        assert not server.chat_service.is_uploading("general", "sender")
+        assert server.chat_service.upload_reserved == 0
+
+        await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_upload_overflowing_declared_size_is_dropped():
+    async def scenario():
+        server = Server(make_settings())
+        sender = await server.connect("sender")
+        listener = await server.connect("listener")
+
+        await server.send(sender, "/upload 10")
+        await server.send(sender, "x" * 6)
+        await server.send(sender, "x" * 6)
+
+        assert sender.received[-1] == {"error": ErrorMessages.UPLOAD_OVERFLOW.value}
+        assert listener.received == []
+        assert not server.chat_service.is_uploading("general", "sender")
+        assert server.chat_service.upload_reserved == 0
+
+        await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_expired_message_body_is_released_after_stream_finishes():
+    async def scenario():
+        server = Server(make_settings(), stream_chunk_size=100)
+        sender = await server.connect("sender")
+        listener = await server.connect("listener")
+        repository = server.chat_service.use_cases.repository
+        bodies = []
+        data_during_stream = []
+
+        async def send_text(data):
+            frame = json.loads(data)
+            if frame["type"] == "message_start":
+                # The message expires while its stream is still in progress
+                topic = await repository.get_topic("general")
+                bodies.append(topic.messages[-1].body)
+                topic.remove_expired_messages(time.time() + 3600, ttl=30)
+                assert topic.messages == []
+            data_during_stream.append(bodies[0].data is not None)
+            listener.received.append(frame)
+        listener.send_text = send_text
+
+        await upload(server, sender, "x" * 1000)
+
+        assert all(data_during_stream)
+        assert "".join(f["data"] for f in listener.received if f["type"] == "message_chunk") == "x" * 1000
+        assert bodies[0].refs == 0
+        assert bodies[0].data is None
+
+        await server.close()
+
+    asyncio.run(scenario())
+
+
+def test_expired_message_body_is_released_without_readers():
+    async def scenario():
+        server = Server(make_settings())
+        sender = await server.connect("sender")
+
+        await upload(server, sender, "x" * 1000)
+        topic = await server.chat_service.use_cases.repository.get_topic("general")
+        body = topic.messages[-1].body
+        assert body.data == "x" * 1000
+
+        topic.remove_expired_messages(time.time() + 3600, ttl=30)
+        assert body.data is None
+
+        await server.close()
+
+    asyncio.run(scenario())